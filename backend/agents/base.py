@@ -1,5 +1,6 @@
-import os
-from typing import Optional, Tuple
+import os, hashlib, logging
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
 
 # Try to load dotenv if present, but don't hard-require it
 try:
@@ -8,6 +9,31 @@ try:
 except Exception:
     pass
 
+# Cross-worker rate budget + response cache (optional; in-process only if missing)
+try:
+    import coordination  # type: ignore
+except Exception as e:
+    logging.getLogger(__name__).warning("Shared LLM rate budget/cache disabled: %s", e)
+    coordination = None
+
+# --- Per-run LLM failure tracking ---
+# llm_complete keeps returning text so agents never crash, but a run that hit
+# rate-limit / API errors must not be cached or shared as if it were clean.
+# The list object is shared with threads LangGraph copies the context into.
+_llm_issues: ContextVar[Optional[List[str]]] = ContextVar("llm_issues", default=None)
+
+def track_llm_issues() -> List[str]:
+    """Start collecting LLM failures for the current run; returns the live list."""
+    issues: List[str] = []
+    _llm_issues.set(issues)
+    return issues
+
+def _llm_error(message: str) -> str:
+    issues = _llm_issues.get()
+    if issues is not None:
+        issues.append(message)
+    return f"[LLM error: {message}]"
+
 # --- Gemini setup with graceful fallback ---
 def _get_genai() -> Tuple[Optional[object], Optional[str]]:
     """
@@ -35,12 +61,33 @@ def llm_complete(prompt: str) -> str:
     genai, model_name = _get_genai()
     if genai is None:
         return f"[FAKE GEMINI RESPONSE] {prompt[:120]}..."
+
+    cache_key = hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+    if coordination is not None:
+        try:
+            cached = coordination.cache_get(cache_key)
+            if cached is not None:
+                return cached
+            if not coordination.acquire_llm_slot():
+                return _llm_error("shared Gemini rate budget exhausted")
+        except Exception:
+            pass  # coordination store unavailable -> behave as a single worker
+
     try:
         model = genai.GenerativeModel(model_name)  # type: ignore[attr-defined]
         resp = model.generate_content(prompt)
-        return getattr(resp, "text", "") or "(empty response)"
+        text = getattr(resp, "text", "") or ""
     except Exception as e:
-        return f"[LLM error: {e}]"
+        return _llm_error(str(e))
+    if not text:
+        return "(empty response)"
+
+    if coordination is not None:
+        try:
+            coordination.cache_put(cache_key, text)
+        except Exception:
+            pass
+    return text
 
 # Backwards-compat alias
 def call_gemini(prompt: str) -> str:
@@ -1,10 +1,11 @@
 # app.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from docx import Document
 from dotenv import load_dotenv
-import os, json, hashlib
+import os, json, hashlib, asyncio, logging, sqlite3, time
 
 # ---------------------------
 # Load environment variables
@@ -23,14 +24,28 @@ except Exception:
 
 llm_complete = None
 try:
-    from agents.base import llm_complete as _llm
+    from agents.base import llm_complete as _llm, track_llm_issues
     llm_complete = _llm
 except Exception:
     try:
-        from base import llm_complete as _llm  # fallback if base.py isn't inside "agents/"
+        from base import llm_complete as _llm, track_llm_issues  # fallback if base.py isn't inside "agents/"
         llm_complete = _llm
     except Exception:
-        pass
+        def track_llm_issues():
+            return []
+
+# - history: SQLite + FTS5 store of every completed validation
+try:
+    import history
+except Exception:
+    history = None
+
+# - coordination: SQLite (WAL) state shared by all uvicorn/gunicorn workers
+try:
+    import coordination
+except Exception as e:
+    logging.getLogger(__name__).warning("Cross-worker coordination disabled: %s", e)
+    coordination = None
 
 def _llm(text: str) -> str:
     """Safe LLM call with graceful fallback."""
@@ -58,7 +73,7 @@ app.add_middleware(
 # ---------------------------
 # Global Storage for Report
 # ---------------------------
-last_report = {}  # {"idea": str, "mode": "fast"|"deep", "report": {...}}
+last_report = {}  # {"idea": str, "mode": "fast"|"deep", "report": {...}}; shared copy lives in coordination.py
 
 # ---------------------------
 # Deterministic dynamic metrics (fallback when JSON parse fails or no key)
@@ -201,6 +216,9 @@ def run_validation(idea: str, mode: str = "fast"):
     2) Asks LLM for a structured JSON summary (problem/solution/trends/risks/market/traction)
     3) For deep mode, also returns `deep_json` (structured agent details)
     """
+    # LLM failures (rate budget / API errors) or a graph error mark this run degraded
+    llm_issues = track_llm_issues()
+
     # 1) Run LangGraph pipeline if present
     market = competitors = financials = report_text = ""
     if callable(run_graph):
@@ -212,6 +230,7 @@ def run_validation(idea: str, mode: str = "fast"):
             report_text = state.get("report", "") or ""
         except Exception as e:
             report_text = f"(Graph error: {e})"
+            llm_issues.append(f"graph error: {e}")  # sections are empty -> partial run
 
     # 2) Convert to structured fields
     summary = _structured_summary_with_llm(idea, market, competitors, financials)
@@ -238,11 +257,77 @@ def run_validation(idea: str, mode: str = "fast"):
         },
         # new: structured JSON for deep view
         "deep_json": deep_json,
+        # True when the run is partial; such runs are not reused by later requests
+        "degraded": bool(llm_issues),
+        "llm_errors": list(llm_issues),
     }
 
 # ---------------------------
 # API Endpoints
 # ---------------------------
+def _validation_key(idea: str, mode: str) -> str:
+    norm = " ".join(idea.lower().split())
+    return hashlib.sha256(f"{mode}\n{norm}".encode("utf-8")).hexdigest()
+
+def _run_and_record(idea: str, mode: str) -> dict:
+    """Run the pipeline and persist it; returns the /validate response body."""
+    record = {"idea": idea, "report": run_validation(idea, mode), "mode": mode}
+    if history is not None:
+        try:
+            record["id"] = history.save_report(idea, mode, record["report"])
+        except Exception:
+            pass  # persistence must never break validation
+    return record
+
+async def _keep_claim(key: str, token: str):
+    """Refresh the lease while we run, so a short lease only expires if this worker dies."""
+    while True:
+        await asyncio.sleep(coordination.VALIDATION_LEASE / 3)
+        try:
+            await run_in_threadpool(coordination.refresh_claim, key, token)
+        except sqlite3.Error:
+            pass
+
+async def _run_shared(idea: str, mode: str) -> dict:
+    """
+    Run a validation at most once across all workers:
+    reuse a fresh result, wait for a worker already running it, or claim and run it.
+    """
+    key = _validation_key(idea, mode)
+    started = time.time()
+    since = started - coordination.VALIDATION_RESULT_TTL
+    waiting_since = None  # set once we've waited on another worker's run
+
+    while True:
+        token, done = await run_in_threadpool(coordination.claim_validation, key, since, waiting_since)
+        if done is not None:
+            # same normalized idea, but answer with the caller's wording
+            return {**done, "idea": idea}
+        if token is not None:
+            heartbeat = asyncio.create_task(_keep_claim(key, token))
+            try:
+                record = await run_in_threadpool(_run_and_record, idea, mode)
+            except Exception:
+                await run_in_threadpool(coordination.release_validation, key, token)
+                raise
+            finally:
+                heartbeat.cancel()
+            try:
+                # partial runs go to requests already waiting (so they don't each
+                # rerun under quota pressure) but are excluded from later reuse
+                degraded = bool(record["report"].get("degraded"))
+                await run_in_threadpool(coordination.finish_validation, key, token, record, degraded)
+            except sqlite3.Error:
+                pass
+            return record
+
+        # Another worker owns it: poll for its result without blocking the event loop.
+        # Its lease is refreshed while it runs, so this ends within VALIDATION_LEASE if it dies.
+        waiting_since = started
+        while await run_in_threadpool(coordination.is_claimed, key):
+            await asyncio.sleep(0.5)
+        # owner finished (claim_validation returns its result) or gave up -> try again
+
 @app.post("/validate")
 async def validate(payload: dict):
     """Validate startup idea using fast or deep analysis."""
@@ -255,10 +340,48 @@ async def validate(payload: dict):
     if mode not in {"fast", "deep"}:
         mode = "fast"
 
-    final_report = run_validation(idea, mode)
-    last_report = {"idea": idea, "report": final_report, "mode": mode}
+    record = None
+    if coordination is not None:
+        try:
+            record = await _run_shared(idea, mode)
+        except sqlite3.Error:
+            record = None  # coordination store unavailable -> run locally
+    if record is None:
+        record = await run_in_threadpool(_run_and_record, idea, mode)
+
+    last_report = record
+    if coordination is not None:
+        try:
+            # /generate_report may land on a different worker
+            await run_in_threadpool(coordination.set_latest_report, record)
+        except sqlite3.Error:
+            pass
     return last_report
 
+@app.get("/reports")
+def list_reports(limit: int = 20, offset: int = 0, include_degraded: bool = True):
+    """Paginated list of past validations, newest first."""
+    if history is None:
+        raise HTTPException(status_code=503, detail="Report history unavailable.")
+    return history.list_reports(limit, offset, include_degraded)
+
+@app.get("/reports/search")
+def search_reports(q: str = "", limit: int = 20, offset: int = 0, include_degraded: bool = True):
+    """Full-text search across past validations (idea, agent sections, deep JSON)."""
+    if history is None:
+        raise HTTPException(status_code=503, detail="Report history unavailable.")
+    return history.search_reports(q, limit, offset, include_degraded)
+
+@app.get("/reports/{report_id}")
+def get_report(report_id: int):
+    """Fetch one stored validation in the same shape /validate returned."""
+    if history is None:
+        raise HTTPException(status_code=503, detail="Report history unavailable.")
+    record = history.get_report(report_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return record
+
 @app.get("/generate_report")
 def generate_report():
     """
@@ -267,8 +390,14 @@ def generate_report():
     - Otherwise, ask LLM to draft a generic deck.
     Works even without an API key (falls back to fake content).
     """
-    idea = last_report.get("idea", "Your Startup")
-    report = last_report.get("report", {})
+    latest = last_report
+    if coordination is not None:
+        try:
+            latest = coordination.get_latest_report() or last_report
+        except sqlite3.Error:
+            pass
+    idea = latest.get("idea", "Your Startup")
+    report = latest.get("report", {})
     problem = report.get("problem", "")
     solution = report.get("solution", "")
     trends = report.get("trends", [])
@@ -0,0 +1,286 @@
+# coordination.py
+import os, json, logging, random, sqlite3, time, uuid
+from contextlib import closing
+from typing import Any, Dict, Optional, Tuple
+
+# ---------------------------
+# Cross-worker coordination
+# ---------------------------
+# uvicorn/gunicorn workers are separate processes, so module globals are not
+# shared. This keeps the few pieces of state that must be global (LLM rate
+# budget, in-flight validations, LLM response cache) in one SQLite file in
+# WAL mode. No external service required; every worker on the host sees it.
+DB_PATH = os.getenv("COORD_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "coordination.db")
+
+log = logging.getLogger(__name__)
+
+def _env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    """Read a numeric env var; a typo falls back to the default instead of disabling coordination."""
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        log.warning("Ignoring %s=%r (not a number); using %s", name, raw, default)
+        return default
+    return max(minimum, value)
+
+# Gemini quota shared by ALL workers (requests per minute); 0 disables limiting.
+# Default matches the free tier of gemini-2.5-flash (10 RPM), so an unconfigured
+# multi-worker deployment stays inside quota; raise it for paid keys.
+LLM_RPM = _env_float("GEMINI_RPM", 10.0)
+# How long a call may wait for budget before giving up.
+LLM_RATE_WAIT = _env_float("LLM_RATE_WAIT", 120.0)
+# Shared LLM response cache lifetime (seconds). 0 disables caching.
+LLM_CACHE_TTL = _env_float("LLM_CACHE_TTL", 86400.0)
+# A worker's claim on a validation expires after this long unless the owner
+# refreshes it (it does so every LEASE/3), so a crashed owner is noticed quickly.
+VALIDATION_LEASE = _env_float("VALIDATION_LEASE", 60.0, minimum=5.0)
+# Finished validations are reused for identical requests within this window.
+VALIDATION_RESULT_TTL = _env_float("VALIDATION_RESULT_TTL", 300.0)
+
+RATE_WINDOW = 60.0  # seconds; GEMINI_RPM is enforced over any sliding window of this length
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    name        TEXT NOT NULL,
+    ts          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_calls_name_ts ON llm_calls (name, ts);
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    expires_at  REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS validation_claims (
+    key         TEXT PRIMARY KEY,
+    owner       TEXT NOT NULL,
+    expires_at  REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS validation_results (
+    key          TEXT PRIMARY KEY,
+    payload      TEXT NOT NULL,
+    finished_at  REAL NOT NULL,
+    degraded     INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS latest_report (
+    id           INTEGER PRIMARY KEY CHECK (id = 1),
+    payload      TEXT NOT NULL,
+    updated_at   REAL NOT NULL
+);
+"""
+
+_initialized_path: Optional[str] = None
+
+def _connect() -> sqlite3.Connection:
+    """Autocommit connection; callers open BEGIN IMMEDIATE for read-modify-write."""
+    global _initialized_path
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if _initialized_path != DB_PATH:
+        conn.executescript(_SCHEMA)
+        # databases created before the `degraded` flag existed
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(validation_results)")}
+        if "degraded" not in cols:
+            conn.execute("ALTER TABLE validation_results ADD COLUMN degraded INTEGER NOT NULL DEFAULT 0")
+        _initialized_path = DB_PATH
+    return conn
+
+# ---------------------------
+# Global LLM rate budget (sliding window shared by all workers)
+# ---------------------------
+def _try_take_slot(conn: sqlite3.Connection, name: str, rpm: float) -> float:
+    """
+    Record one call if fewer than `rpm` happened in the last RATE_WINDOW seconds.
+    Returns 0.0 on success, else seconds until the oldest call leaves the window.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM llm_calls WHERE name = ? AND ts <= ?", (name, now - RATE_WINDOW))
+        count, oldest = conn.execute(
+            "SELECT COUNT(*), MIN(ts) FROM llm_calls WHERE name = ?", (name,)
+        ).fetchone()
+        wait = 0.0
+        if count < int(rpm):
+            conn.execute("INSERT INTO llm_calls (name, ts) VALUES (?, ?)", (name, now))
+        else:
+            wait = max(0.01, oldest + RATE_WINDOW - now)
+        conn.execute("COMMIT")
+        return wait
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def acquire_llm_slot(timeout: Optional[float] = None, name: str = "gemini") -> bool:
+    """
+    Block until the shared budget allows one more LLM call.
+    Returns False if no slot frees up within `timeout` seconds.
+    """
+    if LLM_RPM < 1:
+        return True
+    deadline = time.time() + (LLM_RATE_WAIT if timeout is None else timeout)
+    with closing(_connect()) as conn:
+        while True:
+            wait = _try_take_slot(conn, name, LLM_RPM)
+            if wait <= 0:
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            # jitter so waiting workers don't stampede the same instant
+            time.sleep(min(wait, remaining) + random.uniform(0, 0.05))
+
+# ---------------------------
+# Shared LLM response cache
+# ---------------------------
+def cache_get(key: str) -> Optional[str]:
+    if LLM_CACHE_TTL <= 0:
+        return None
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+    return row[0] if row else None
+
+def cache_put(key: str, value: str) -> None:
+    if LLM_CACHE_TTL <= 0:
+        return
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + LLM_CACHE_TTL),
+        )
+        # cheap amortized cleanup instead of a background job
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+
+# ---------------------------
+# Cross-worker dedup of in-flight validations
+# ---------------------------
+def claim_validation(
+    key: str, since: Optional[float] = None, waiting_since: Optional[float] = None
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Try to become the worker that runs validation `key`.
+    Returns (token, None) on success, (None, result) if a usable result exists,
+    or (None, None) if another live worker owns it.
+    Usable means: a clean result published no earlier than `since`, or - for a
+    request that has been waiting since `waiting_since` - a degraded one that
+    finished while it waited. Degraded runs are thus handed to their waiters
+    (no rerun per waiter) but never reused by later requests.
+    The result check and the claim happen in one transaction, so a run that
+    finishes just before we claim is reused rather than repeated.
+    """
+    if since is None:
+        since = time.time() - VALIDATION_RESULT_TTL
+    if waiting_since is None:
+        waiting_since = float("inf")
+    token = f"{WORKER_ID}-{uuid.uuid4().hex[:8]}"
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """SELECT payload FROM validation_results
+                   WHERE key = ? AND ((degraded = 0 AND finished_at >= ?) OR finished_at >= ?)""",
+                (key, since, waiting_since),
+            ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return None, json.loads(row[0])
+            conn.execute("DELETE FROM validation_claims WHERE key = ? AND expires_at <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO validation_claims (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, token, now + VALIDATION_LEASE),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return (token if cur.rowcount == 1 else None), None
+
+def refresh_claim(key: str, token: str) -> bool:
+    """Extend the owner's lease; False if the claim was lost (expired and taken over)."""
+    with closing(_connect()) as conn:
+        cur = conn.execute(
+            "UPDATE validation_claims SET expires_at = ? WHERE key = ? AND owner = ?",
+            (time.time() + VALIDATION_LEASE, key, token),
+        )
+    return cur.rowcount == 1
+
+def is_claimed(key: str) -> bool:
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM validation_claims WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+    return row is not None
+
+def finish_validation(key: str, token: str, result: Dict[str, Any], degraded: bool = False) -> None:
+    """Publish the result for waiting workers and drop the claim (see claim_validation for degraded)."""
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO validation_results (key, payload, finished_at, degraded) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), now, 1 if degraded else 0),
+            )
+            conn.execute("DELETE FROM validation_claims WHERE key = ? AND owner = ?", (key, token))
+            # keep results long enough for slow pollers even when reuse is disabled
+            conn.execute(
+                "DELETE FROM validation_results WHERE finished_at < ?",
+                (now - max(VALIDATION_RESULT_TTL, 60),),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def release_validation(key: str, token: str) -> None:
+    """Drop a claim without a result (owner failed) so a waiter can take over."""
+    with closing(_connect()) as conn:
+        conn.execute("DELETE FROM validation_claims WHERE key = ? AND owner = ?", (key, token))
+
+def get_validation_result(key: str, since: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Clean result published by any worker no earlier than `since`
+    (defaults to now - VALIDATION_RESULT_TTL).
+    """
+    if since is None:
+        since = time.time() - VALIDATION_RESULT_TTL
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT payload FROM validation_results WHERE key = ? AND finished_at >= ? AND degraded = 0",
+            (key, since),
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+# ---------------------------
+# Latest report (what /generate_report builds the deck from)
+# ---------------------------
+def set_latest_report(record: Dict[str, Any]) -> None:
+    with closing(_connect()) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO latest_report (id, payload, updated_at) VALUES (1, ?, ?)",
+            (json.dumps(record, ensure_ascii=False), time.time()),
+        )
+
+def get_latest_report() -> Optional[Dict[str, Any]]:
+    with closing(_connect()) as conn:
+        row = conn.execute("SELECT payload FROM latest_report WHERE id = 1").fetchone()
+    return json.loads(row[0]) if row else None
+
+if LLM_RPM >= 1:
+    log.info("Shared Gemini budget: %d calls / %ds across all workers (GEMINI_RPM)", int(LLM_RPM), int(RATE_WINDOW))
+else:
+    log.warning("GEMINI_RPM=0: no global Gemini rate limit; several workers may exceed the quota")
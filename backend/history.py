@@ -0,0 +1,199 @@
+# history.py
+import os, json, re, sqlite3, time
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+# ---------------------------
+# Storage location
+# ---------------------------
+# Every completed validation is persisted to a local SQLite file so past
+# analyses can be listed / searched without rerunning the pipeline.
+DB_PATH = os.getenv("REPORT_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports.db")
+
+MAX_PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at   REAL NOT NULL,
+    idea         TEXT NOT NULL,
+    mode         TEXT NOT NULL,
+    problem      TEXT NOT NULL DEFAULT '',
+    solution     TEXT NOT NULL DEFAULT '',
+    market       TEXT NOT NULL DEFAULT '',
+    competitors  TEXT NOT NULL DEFAULT '',
+    financials   TEXT NOT NULL DEFAULT '',
+    report_text  TEXT NOT NULL DEFAULT '',
+    deep_text    TEXT NOT NULL DEFAULT '',
+    degraded     INTEGER NOT NULL DEFAULT 0,
+    payload      TEXT NOT NULL
+);
+
+-- External-content FTS index: text lives once in `reports`, the index only holds tokens.
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    idea, problem, solution, market, competitors, financials, report_text, deep_text,
+    content='reports', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+    INSERT INTO reports_fts(rowid, idea, problem, solution, market, competitors, financials, report_text, deep_text)
+    VALUES (new.id, new.idea, new.problem, new.solution, new.market, new.competitors, new.financials, new.report_text, new.deep_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+    INSERT INTO reports_fts(reports_fts, rowid, idea, problem, solution, market, competitors, financials, report_text, deep_text)
+    VALUES ('delete', old.id, old.idea, old.problem, old.solution, old.market, old.competitors, old.financials, old.report_text, old.deep_text);
+END;
+"""
+
+_initialized_path: Optional[str] = None
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection (one per call keeps this safe under FastAPI's threadpool)."""
+    global _initialized_path
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if _initialized_path != DB_PATH:
+        conn.executescript(_SCHEMA)
+        # databases created before the `degraded` flag existed
+        cols = {r["name"] for r in conn.execute("PRAGMA table_info(reports)")}
+        if "degraded" not in cols:
+            conn.execute("ALTER TABLE reports ADD COLUMN degraded INTEGER NOT NULL DEFAULT 0")
+            conn.commit()
+        _initialized_path = DB_PATH
+    return conn
+
+def _page(limit: Any, offset: Any):
+    """Clamp pagination params to sane bounds."""
+    try:
+        limit = int(limit)
+    except Exception:
+        limit = 20
+    try:
+        offset = int(offset)
+    except Exception:
+        offset = 0
+    return max(1, min(limit, MAX_PAGE_SIZE)), max(0, offset)
+
+def _deep_to_text(deep_json: Any) -> str:
+    """Flatten deep_json (sections -> title + bullets) into indexable text."""
+    if not isinstance(deep_json, dict):
+        return ""
+    lines: List[str] = []
+    for part in deep_json.values():
+        for sec in (part or {}).get("sections", []) if isinstance(part, dict) else []:
+            if not isinstance(sec, dict):
+                continue
+            lines.append(str(sec.get("title", "")))
+            lines.extend(str(b) for b in sec.get("bullets", []) or [])
+    return "\n".join(ln for ln in lines if ln)
+
+def _fts_query(q: str) -> str:
+    """
+    Turn free user text into a safe FTS5 query: every word becomes a quoted
+    prefix term, all terms must match. Avoids syntax errors on stray quotes/operators.
+    """
+    terms = re.findall(r"\w+", q or "", flags=re.UNICODE)
+    return " ".join(f'"{t}"*' for t in terms)
+
+def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "idea": row["idea"],
+        "mode": row["mode"],
+        "problem": row["problem"],
+        "degraded": bool(row["degraded"]),
+    }
+
+# ---------------------------
+# Public API
+# ---------------------------
+def save_report(idea: str, mode: str, report: Dict[str, Any]) -> int:
+    """
+    Persist a completed `run_validation` result and return its id.
+    Partial runs (report["degraded"]) are stored too, flagged so they can be filtered.
+    """
+    sections = report.get("sections") or {}
+    row = (
+        time.time(),
+        idea,
+        mode,
+        str(report.get("problem", "") or ""),
+        str(report.get("solution", "") or ""),
+        str(sections.get("market", "") or ""),
+        str(sections.get("competitors", "") or ""),
+        str(sections.get("financials", "") or ""),
+        str(report.get("report_text", "") or ""),
+        _deep_to_text(report.get("deep_json")),
+        1 if report.get("degraded") else 0,
+        json.dumps(report, ensure_ascii=False),
+    )
+    with closing(_connect()) as conn, conn:
+        cur = conn.execute(
+            """INSERT INTO reports (created_at, idea, mode, problem, solution, market,
+                                    competitors, financials, report_text, deep_text, degraded, payload)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            row,
+        )
+        return int(cur.lastrowid)
+
+def list_reports(limit: int = 20, offset: int = 0, include_degraded: bool = True) -> Dict[str, Any]:
+    """Newest-first page of stored reports (summaries only)."""
+    limit, offset = _page(limit, offset)
+    where = "" if include_degraded else "WHERE degraded = 0"
+    with closing(_connect()) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM reports {where}").fetchone()[0]
+        rows = conn.execute(
+            f"""SELECT id, created_at, idea, mode, problem, degraded FROM reports {where}
+                ORDER BY id DESC LIMIT ? OFFSET ?""",
+            (limit, offset),
+        ).fetchall()
+    return {"total": total, "limit": limit, "offset": offset, "items": [_summary(r) for r in rows]}
+
+def search_reports(q: str, limit: int = 20, offset: int = 0, include_degraded: bool = True) -> Dict[str, Any]:
+    """Full-text search over idea, agent sections, report text and deep_json; best matches first."""
+    limit, offset = _page(limit, offset)
+    match = _fts_query(q)
+    if not match:
+        return {"query": q, "total": 0, "limit": limit, "offset": offset, "items": []}
+    extra = "" if include_degraded else "AND r.degraded = 0"
+    with closing(_connect()) as conn:
+        total = conn.execute(
+            f"""SELECT COUNT(*) FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid
+                WHERE reports_fts MATCH ? {extra}""",
+            (match,),
+        ).fetchone()[0]
+        rows = conn.execute(
+            f"""SELECT r.id, r.created_at, r.idea, r.mode, r.problem, r.degraded,
+                      snippet(reports_fts, -1, '[', ']', '…', 12) AS snippet
+               FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid
+               WHERE reports_fts MATCH ? {extra}
+               ORDER BY bm25(reports_fts, 10.0, 2.0, 2.0, 1.0, 3.0, 1.0, 1.0, 1.0)
+               LIMIT ? OFFSET ?""",
+            (match, limit, offset),
+        ).fetchall()
+    items = []
+    for r in rows:
+        item = _summary(r)
+        item["snippet"] = r["snippet"]
+        items.append(item)
+    return {"query": q, "total": total, "limit": limit, "offset": offset, "items": items}
+
+def get_report(report_id: int) -> Optional[Dict[str, Any]]:
+    """Full stored record (same shape as POST /validate) or None."""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT id, created_at, idea, mode, payload FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "idea": row["idea"],
+        "mode": row["mode"],
+        "report": json.loads(row["payload"]),
+    }